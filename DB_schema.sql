@@ -19,7 +19,7 @@ CREATE TABLE parts (
     quantity INT DEFAULT 1,
     last_checked DATE DEFAULT CURRENT_DATE,
     PRIMARY KEY (robot_id, id),
-    FOREIGN KEY (robot_id) REFERENCES robots(id)
+    FOREIGN KEY (robot_id) REFERENCES robots(id) ON DELETE CASCADE
 );
 
 -- Table: maintenance_logs
@@ -30,6 +30,9 @@ CREATE TABLE maintenance_logs (
     description VARCHAR(200) NOT NULL,
     log_date DATE DEFAULT CURRENT_DATE,
     done_by VARCHAR(50) NOT NULL,
-    FOREIGN KEY (robot_id) REFERENCES robots(id),
+    FOREIGN KEY (robot_id) REFERENCES robots(id) ON DELETE CASCADE,
     FOREIGN KEY (robot_id, parts_id) REFERENCES parts(robot_id, id)
 );
+
+-- Index: robot's maintenance logs, optionally filtered on parts_id IS NULL
+CREATE INDEX ix_ml_robot_parts ON maintenance_logs (robot_id, parts_id);
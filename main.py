@@ -1,44 +1,66 @@
 
 
 
+import asyncio
+import functools
 from contextlib import asynccontextmanager
 from datetime import date
-from typing import Annotated
-from fastapi import Depends, FastAPI, HTTPException, Response
-from sqlalchemy import ForeignKey, ForeignKeyConstraint, PrimaryKeyConstraint
-from sqlmodel import VARCHAR, Column, Field, SQLModel, Session, create_engine, select
+from pathlib import Path
+from typing import Annotated, Literal
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import JSON, Date, ForeignKey, Index, bindparam, delete, insert, ForeignKeyConstraint, PrimaryKeyConstraint, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from sqlmodel import VARCHAR, Column, Field, Relationship, SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
-import os 
-from dotenv import load_dotenv
+import hashlib
+import orjson
+import time
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class robots(SQLModel , table=True) :
-    id : int = Field(primary_key=True)
+    id : int | None = Field(default=None , primary_key=True)
     name : str = Field(sa_column=Column(VARCHAR(50) , unique=True))
     type : str = Field(sa_column=Column(VARCHAR(50)))
-    created_at : date = Field(default_factory=lambda : date.today())
+    created_at : date | None = Field(default=None , sa_column=Column(Date , server_default=func.current_date()))
+    parts : list["parts"] = Relationship(back_populates="robot" , sa_relationship_kwargs={"passive_deletes" : True , "order_by" : "parts.id"})
+    maintenance_logs : list["maintenance_logs"] = Relationship(back_populates="robot" , sa_relationship_kwargs={"passive_deletes" : True , "order_by" : "maintenance_logs.id"})
+    # server-filled columns come back in the INSERT's RETURNING clause
+    __mapper_args__ = {"eager_defaults" : True}
 
 class parts(SQLModel , table=True) :
-    robot_id : int = Field(sa_column=Column(ForeignKey("robots.id")))
+    robot_id : int = Field(sa_column=Column(ForeignKey("robots.id" , ondelete="CASCADE")))
     id : int | None = Field(default=None)
     name : str = Field(sa_column=Column(VARCHAR(50)))
     quantity : int = Field(default=1)
-    last_checked : date = Field(default_factory=lambda : date.today())
+    last_checked : date | None = Field(default=None , sa_column=Column(Date , server_default=func.current_date()))
+    robot : robots | None = Relationship(back_populates="parts")
     __table_args__ = (
         PrimaryKeyConstraint("robot_id" , "id") ,
     )
+    __mapper_args__ = {"eager_defaults" : True}
 
 class maintenance_logs(SQLModel , table=True) :
-    id : int = Field(primary_key=True) 
+    id : int | None = Field(default=None , primary_key=True) 
     robot_id : int 
     parts_id : int | None = None 
     description : str = Field(sa_column=Column(VARCHAR(200)))
-    log_date : date = Field(default_factory=lambda : date.today()) # type: ignore
+    log_date : date | None = Field(default=None , sa_column=Column(Date , server_default=func.current_date()))
     done_by : str = Field(sa_column=Column(VARCHAR(50)))
+    robot : robots | None = Relationship(back_populates="maintenance_logs")
     __table_args__ = (
-        ForeignKeyConstraint(["robot_id"] , ["robots.id"]) ,
-        ForeignKeyConstraint(["robot_id" , "parts_id"] , ["parts.robot_id" , "parts.id"])
+        ForeignKeyConstraint(["robot_id"] , ["robots.id"] , ondelete="CASCADE") ,
+        ForeignKeyConstraint(["robot_id" , "parts_id"] , ["parts.robot_id" , "parts.id"]) ,
+        # also serves plain robot_id lookups, so robot_id needs no index of its own
+        Index("ix_ml_robot_parts" , "robot_id" , "parts_id")
         )
+    __mapper_args__ = {"eager_defaults" : True}
     
 class create_update_robots(SQLModel) :
     name: str | None = None
@@ -84,202 +106,337 @@ class create_maintenance_log(SQLModel) :
         } 
     }
 
-load_dotenv()
- 
-USERNAME = os.environ.get("DB_USER")
-PORT = os.environ.get("DB_PORT")
-DATABASE = os.environ.get("DB_NAME")
-PASSWORD = os.environ.get("DB_PASSWORD")
-HOST = os.environ.get("DB_HOST")
+class app_settings(BaseSettings) :
+    # read from the environment or .env ; a missing DB_* value stops startup
+    db_user : str
+    db_password : str
+    db_host : str
+    db_port : int
+    db_name : str
+    db_pool_size : int = 20
+    db_max_overflow : int = 20
+    db_pool_recycle : int = 1800
+    db_pool_timeout : int = 30
+    db_command_timeout : int = 30
+    # set to 0 behind PgBouncer in transaction mode, which can't keep prepared statements
+    db_statement_cache_size : int = 100
+    cache_ttl : int = 30
+    cache_max_entries : int = 1024
+    # .env next to this file, whatever the working directory
+    model_config = SettingsConfigDict(env_file=Path(__file__).with_name(".env") , extra="ignore")
 
-DATABAS_URL = f"postgresql://{USERNAME}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}"
-engine = create_engine(DATABAS_URL)
+settings = app_settings() # type: ignore
 
-def sessions() :
-    with Session(engine) as sessions :
+# URL.create escapes special characters in the credentials
+DATABAS_URL = URL.create(
+    "postgresql+asyncpg" ,
+    username=settings.db_user ,
+    password=settings.db_password ,
+    host=settings.db_host ,
+    port=settings.db_port ,
+    database=settings.db_name
+)
+engine = create_async_engine(
+    DATABAS_URL ,
+    pool_size=settings.db_pool_size ,
+    max_overflow=settings.db_max_overflow ,
+    pool_pre_ping=True ,
+    pool_recycle=settings.db_pool_recycle ,
+    pool_timeout=settings.db_pool_timeout ,
+    connect_args={
+        "server_settings" : {"jit" : "off" , "application_name" : "robohub"} ,
+        "command_timeout" : settings.db_command_timeout ,
+        "statement_cache_size" : settings.db_statement_cache_size ,
+        "prepared_statement_cache_size" : settings.db_statement_cache_size
+    }
+)
+async_session = async_sessionmaker(engine , class_=AsyncSession , expire_on_commit=False)
+
+async def sessions() :
+    async with async_session() as sessions :
         yield sessions
 
-SessionDep = Annotated[Session , Depends(sessions)]
+SessionDep = Annotated[AsyncSession , Depends(sessions)]
 
 @asynccontextmanager 
 async def lifespan(app : FastAPI) :
     yield
+    await engine.dispose()
+
+app = FastAPI(root_path="/ROBOHUB" , lifespan=lifespan , default_response_class=ORJSONResponse)
 
-app = FastAPI(root_path="/ROBOHUB" , lifespan=lifespan)
+# GET responses keyed by path + query : (expires_at , etag , body)
+response_cache : dict[str , tuple[float , str , bytes]] = {}
+# bumped by every write, so a GET that overlapped a write doesn't store what it read
+cache_generation = 0
+
+def invalidate_cache(path: str) :
+    global cache_generation
+    cache_generation += 1
+    # a write under /robots/{id} can change that robot's reads, the robot list and the log lists
+    segments = path.strip("/").split("/")
+    robot_path = f"/robots/{segments[1]}" if segments[0] == "robots" and len(segments) > 1 else None
+    for key in list(response_cache) :
+        key_path = key.split("?" , 1)[0]
+        if key_path == "/robots" or key_path.startswith("/maintenance_logs") or (
+            robot_path and (key_path == robot_path or key_path.startswith(robot_path + "/"))
+        ) :
+            del response_cache[key]
+
+@app.middleware("http")
+async def http_cache(request: Request , call_next): # type: ignore
+    path = request.url.path.removeprefix(request.scope.get("root_path" , ""))
+    if request.method != "GET" :
+        response = await call_next(request)
+        if request.method in ("POST" , "PATCH" , "PUT" , "DELETE") and response.status_code < 400 :
+            invalidate_cache(path)
+        return response
+    key = f"{path}?{request.url.query}"
+    cached = response_cache.get(key)
+    if cached is None or cached[0] < time.monotonic() :
+        generation = cache_generation
+        response = await call_next(request)
+        if response.status_code != 200 or not response.headers.get("content-type" , "").startswith("application/json") :
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator]) # type: ignore
+        # table rows serialize in hash-seed dependent key order ; sort the keys so the
+        # body and its ETag are the same in every worker and after a restart
+        body = orjson.dumps(orjson.loads(body) , option=orjson.OPT_SORT_KEYS)
+        cached = (time.monotonic() + settings.cache_ttl , f'"{hashlib.sha1(body).hexdigest()}"' , body)
+        if generation == cache_generation :
+            if len(response_cache) >= settings.cache_max_entries :
+                response_cache.clear()
+            response_cache[key] = cached
+    _ , etag , body = cached
+    # no-cache makes browsers revalidate every time, so a write is never hidden by their copy
+    headers = {"ETag" : etag , "Cache-Control" : "no-cache"}
+    if request.headers.get("if-none-match") == etag :
+        return Response(status_code=304 , headers=headers)
+    return Response(content=body , media_type="application/json" , headers=headers)
+
+# added after the cache middleware so it wraps it and cached responses still get CORS headers
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://127.0.0.1:8080" , "http://localhost:8080"],      
+    allow_credentials=True,
+    allow_methods=["GET" , "POST" , "PATCH" , "DELETE" , "OPTIONS"],         
+    allow_headers=["authorization" , "content-type"],          
+)
+
+NOT_NULL_VIOLATION = "23502"
+FOREIGN_KEY_VIOLATION = "23503"
+UNIQUE_VIOLATION = "23505"
+SERIALIZATION_FAILURE = "40001"
+DEADLOCK_DETECTED = "40P01"
+
+def retry_on_conflict(attempts: int = 2 , delay: float = 0.05) : # type: ignore
+    # reruns the whole handler after a rollback when the database asks for a retry
+    def decorator(handler) : # type: ignore
+        @functools.wraps(handler)
+        async def wrapper(*args , **kwargs) : # type: ignore
+            for attempt in range(attempts) :
+                try :
+                    return await handler(*args , **kwargs)
+                except DBAPIError as error :
+                    retryable = isinstance(error , OperationalError) or getattr(error.orig , "sqlstate" , None) in (SERIALIZATION_FAILURE , DEADLOCK_DETECTED)
+                    if not retryable or attempt == attempts - 1 :
+                        raise
+                    await kwargs["session"].rollback()
+                    await asyncio.sleep(delay * 2 ** attempt)
+        return wrapper
+    return decorator
+
+async def robot_exists(robot_id: int , session: AsyncSession) -> bool :
+    # only called on a miss, to tell "no robot" apart from "no rows"
+    return (await session.exec(SELECT_ROBOT_ID , params={"robot_id" : robot_id})).first() is not None
+
+def json_rows(*columns , order_by) : # type: ignore
+    # builds the rows as a JSON array inside Postgres ('[]' when nothing matches),
+    # ordered so the body (and its ETag) doesn't change with the query plan
+    pairs = [item for column in columns for item in (literal_column(f"'{column.key}'") , column)] # type: ignore
+    return func.coalesce(func.json_agg(aggregate_order_by(func.json_build_object(*pairs) , order_by)) , literal_column("'[]'::json") , type_=JSON)
+
+# statements are built once here and reused with bound parameters, so the
+# request path skips statement construction and always hits the compiled
+# cache. Any custom TypeDecorator added to the models must set cache_ok = True
+# or every statement using it is recompiled on each execution.
+SELECT_ROBOTS = select(robots).order_by(robots.id).limit(bindparam("limit")).offset(bindparam("offset")) # type: ignore
+SELECT_ROBOT_ID = select(robots.id).where(robots.id == bindparam("robot_id"))
+DELETE_ROBOT = delete(robots).where(robots.id == bindparam("robot_id")) # type: ignore
+SELECT_ROBOT_PARTS = select(json_rows(parts.id , parts.name , parts.quantity , parts.last_checked , order_by=parts.id)).where(parts.robot_id == bindparam("robot_id")) # type: ignore
+SELECT_ROBOT_PART = select(parts.id , parts.name , parts.quantity , parts.last_checked).where(parts.robot_id == bindparam("robot_id") , parts.id == bindparam("id")) # type: ignore
+SELECT_MAINTENANCE_LOGS = select(maintenance_logs).order_by(maintenance_logs.id).limit(bindparam("limit")).offset(bindparam("offset")) # type: ignore
+EXPORT_MAINTENANCE_LOGS = select(maintenance_logs).order_by(maintenance_logs.id).execution_options(yield_per=1000) # type: ignore
+SELECT_ROBOT_MAINTENANCE_LOGS = select(json_rows(maintenance_logs.parts_id , maintenance_logs.id , maintenance_logs.description , maintenance_logs.log_date , maintenance_logs.done_by , order_by=maintenance_logs.id)).where(maintenance_logs.robot_id == bindparam("robot_id")) # type: ignore
+SELECT_ROBOT_MAINTENANCE_LOGS_WITHOUT_PARTS = SELECT_ROBOT_MAINTENANCE_LOGS.where(maintenance_logs.parts_id.is_(None)) # type: ignore
 
 @app.get("/robots")
-async def get_all_robots(session: SessionDep) :
-    data = session.exec(select(robots)).all()
+async def get_all_robots(session: SessionDep , limit: int = Query(100 , ge=1 , le=1000) , offset: int = Query(0 , ge=0)) :
+    data = (await session.exec(SELECT_ROBOTS , params={"limit" : limit , "offset" : offset})).all()
     return data 
 
 @app.get("/robots/{id}")
-async def get_specific_robot(id: int , session:  SessionDep) :
-    data = session.get(robots , id)
+async def get_specific_robot(id: int , session:  SessionDep , include: Literal["parts" , "maintenance_logs"] | None = None) :
+    if include is None :
+        data = await session.get(robots , id)
+    else :
+        # children come from one extra "WHERE robot_id IN (...)" query
+        data = (await session.exec(select(robots).options(selectinload(getattr(robots , include))).where(robots.id == id))).first()
     if not data :
-        return HTTPException(status_code=404)
-    return data 
+        raise HTTPException(status_code=404 , detail="robot doesn't exist")
+    if include is None :
+        return data 
+    return {**data.model_dump() , include : getattr(data , include)}
 
 @app.post("/robots")
 async def add_robot(body: create_update_robots , session: SessionDep):
-    new_robot = robots(**body.model_dump())
+    new_robot = robots.model_validate(body)
     session.add(new_robot)
-    session.commit()
-    session.refresh(new_robot)
+    await session.commit()
     return {"new_robot" : new_robot}
 
 @app.patch("/robots/{id}")
+@retry_on_conflict()
 async def update_robot(id: int , body: create_update_robots , session: SessionDep):
-    data = session.get(robots , id)
+    data = await session.get(robots , id)
     if not data :
-        raise HTTPException(status_code=404)
+        raise HTTPException(status_code=404 , detail="robot doesn't exist")
     updates = body.model_dump(exclude_unset=True)
     if not updates:
         raise HTTPException(status_code=400,detail="No fields provided for update")
-    for field , values in updates.items() :
-        setattr(data , field , values)
-    try : 
-        session.commit()
-    except Exception:
-        session.rollback() 
-
-    session.refresh(data)
+    data.sqlmodel_update(updates)
+    try :
+        await session.commit()
+    except IntegrityError as error :
+        await session.rollback()
+        sqlstate = getattr(error.orig , "sqlstate" , None)
+        if sqlstate == UNIQUE_VIOLATION :
+            raise HTTPException(status_code=409 , detail="a robot with this name already exists")
+        if sqlstate == NOT_NULL_VIOLATION :
+            raise HTTPException(status_code=422 , detail="fields can't be set to null")
+        raise
     return {"updated version" : data}
 
 @app.delete("/robots/{id}")
 async def delete_robot(id: int , session: SessionDep):
-    data = session.get(robots , id)
-    if not data :
-        return HTTPException(status_code=404)
-    maintenance_logs_data = session.exec(select(maintenance_logs).where(maintenance_logs.robot_id == id)).all()
-    for logs in maintenance_logs_data :
-        session.delete(logs)
-    parts_data = session.exec(select(parts).where(parts.robot_id == id)).all()
-    for part in parts_data :
-        session.delete(part)
-    session.delete(data)
-    session.commit()
+    # parts and maintenance logs are removed by ON DELETE CASCADE
+    result = await session.exec(DELETE_ROBOT , params={"robot_id" : id})
+    if not result.rowcount :
+        raise HTTPException(status_code=404 , detail="robot doesn't exist")
+    await session.commit()
     return Response(status_code=204)
 
 @app.get("/robots/{robot_id}/parts")
 async def get_robot_parts(robot_id: int , session: SessionDep): # type: ignore
-    robot_data = session.get(robots , robot_id)
-    if not robot_data :
+    data = (await session.exec(SELECT_ROBOT_PARTS , params={"robot_id" : robot_id})).one() # type: ignore
+    if not data and not await robot_exists(robot_id , session) :
         raise HTTPException(status_code=404 , detail="robot doesn't exist")
-    results = session.exec(select(parts.id , parts.name , parts.quantity , parts.last_checked).where(parts.robot_id == robot_id)).all() # type: ignore
-    data = [ # type: ignore
-        {
-            "id": row[0],
-            "name": row[1],
-            "quantity": row[2],
-            "last_checked": row[3]
-        }
-        for row in results # type: ignore
-    ]
     return {"robot's id" : robot_id , "robot's parts" : data} # type: ignore
 
 @app.get("/robots/{robot_id}/parts/{id}")
 async def get_part_of_robot(robot_id: int , id: int , session: SessionDep): # type: ignore
-    robot_data = session.get(robots , robot_id)
-    if not robot_data :
-        raise HTTPException(status_code=404 , detail="robot doesn't exist")
-    data = session.get(parts , (robot_id , id))
-    if not data :
+    part_data = (await session.exec(SELECT_ROBOT_PART , params={"robot_id" : robot_id , "id" : id})).mappings().first()
+    if not part_data :
+        if not await robot_exists(robot_id , session) :
+            raise HTTPException(status_code=404 , detail="robot doesn't exist")
         raise HTTPException(status_code=404 , detail="part doesn't exist")
-    part_data = { # type: ignore
-        "id" : data.id ,
-        "name" : data.name ,
-        "quantity" : data.quantity ,
-        "last_checked" : data.last_checked
-    }
     return {"robot's id" : robot_id , "part" : part_data} # type: ignore
 
 @app.post("/robots/{robot_id}/parts")
 async def add_part_in_a_robot(robot_id: int , body:  create_update_parts,session: SessionDep): # type: ignore
-    data = session.get(robots , robot_id)
-    if not data : 
-        raise HTTPException(status_code=404 , detail="robot doesn't exist")
-    new_part = parts(robot_id=robot_id,**body.model_dump())
+    # unset fields are left to the model / database defaults instead of failing validation as None
+    new_part = parts.model_validate(body.model_dump(exclude_none=True) , update={"robot_id" : robot_id})
     session.add(new_part)
-    session.flush()
+    try :
+        await session.commit()
+    except IntegrityError as error :
+        await session.rollback()
+        if getattr(error.orig , "sqlstate" , None) == FOREIGN_KEY_VIOLATION :
+            raise HTTPException(status_code=404 , detail="robot doesn't exist")
+        raise
     
     data = { # type: ignore
         "name": new_part.name ,
         "quantity": new_part.quantity ,
         "last_checked": new_part.last_checked
         }
-    
-    session.commit()
 
     return { "message" : "part successfully added" , "part" : data } # type: ignore
 
 @app.patch("/robots/{robot_id}/parts/{id}")
+@retry_on_conflict()
 async def update_part(robot_id: int , id: int , body: create_update_parts , session: SessionDep ):
-    data = session.get(parts , (robot_id , id))
+    data = await session.get(parts , (robot_id , id))
     if not data :
         raise HTTPException(status_code=404 , detail="part or robot doesn't exist")
     update = body.model_dump(exclude_unset=True)
     if not update :
         raise HTTPException(status_code=404 , detail="no field provided")
-    for field , value in update.items() :
-        setattr(data , field , value) 
-    try : 
-        session.commit()
-    except Exception :
-        session.rollback()
-    session.refresh(data)
+    data.sqlmodel_update(update)
+    try :
+        await session.commit()
+    except IntegrityError as error :
+        await session.rollback()
+        if getattr(error.orig , "sqlstate" , None) == NOT_NULL_VIOLATION :
+            raise HTTPException(status_code=422 , detail="fields can't be set to null")
+        raise
     return {"updated version of part" : data}
 
 @app.delete("/robots/{robot_id}/parts/{id}")
 async def delete_part(robot_id: int , id: int , session: SessionDep):
-    robot_data = session.get(robots , robot_id)
-    if not robot_data :
-        raise HTTPException(status_code=404 , detail="robot doesn't exist")
-    part_data = session.get(parts , (robot_id , id))
+    part_data = await session.get(parts , (robot_id , id))
     if not part_data :
+        if not await robot_exists(robot_id , session) :
+            raise HTTPException(status_code=404 , detail="robot doesn't exist")
         raise HTTPException(status_code=404 , detail="part doesn't exist")
-    session.delete(part_data)
-    session.commit()
+    await session.delete(part_data)
+    await session.commit()
     return Response(status_code=204)
 
 @app.get("/maintenance_logs")
-async def get_maintenance_logs(session: SessionDep):
-    data = session.exec(select(maintenance_logs)).all()
+async def get_maintenance_logs(session: SessionDep , limit: int = Query(100 , ge=1 , le=1000) , offset: int = Query(0 , ge=0)):
+    data = (await session.exec(SELECT_MAINTENANCE_LOGS , params={"limit" : limit , "offset" : offset})).all()
     return {"all maintenance logs" : data}
 
+@app.get("/maintenance_logs/export")
+async def export_maintenance_logs():
+    # streams every log as NDJSON through a server-side cursor, so memory
+    # stays flat however large the table grows
+    async def rows() :
+        async with async_session() as session :
+            async for log in await session.stream_scalars(EXPORT_MAINTENANCE_LOGS) :
+                yield log.model_dump_json() + "\n"
+    return StreamingResponse(rows() , media_type="application/x-ndjson")
+
 @app.get("/maintenance_logs/{id}")
 async def get_maintenance_log(id: int , session: SessionDep):
-    data = session.get(maintenance_logs , id)
+    data = await session.get(maintenance_logs , id)
     return {"robot's maintenance logs" : data}
 
 @app.get("/robots/{robot_id}/maintenance_logs")
-async def get_maintenance_logs_of_a_robot(robot_id: int, session: SessionDep , parts: bool): # type: ignore
-    if parts is True :
-        results = session.exec(select(maintenance_logs.parts_id , maintenance_logs.id , maintenance_logs.description , maintenance_logs.log_date , maintenance_logs.done_by).where(maintenance_logs.robot_id == robot_id)).all() # type: ignore
-    if parts is False :
-        results = session.exec(select(maintenance_logs.parts_id , maintenance_logs.id , maintenance_logs.description , maintenance_logs.log_date , maintenance_logs.done_by).where(maintenance_logs.robot_id == robot_id , maintenance_logs.parts_id == None)).all() # type: ignore
-    data = [ # type: ignore
-        {
-            "parts_id" : row[0] ,
-            "id" : row[1] ,
-            "description" : row[2] ,
-            "log_date" : row[3] ,
-            "done_by" : row[4] ,
-        } for row in results # type: ignore
-    ] 
+async def get_maintenance_logs_of_a_robot(robot_id: int, session: SessionDep , parts: bool = Query(False)): # type: ignore
+    statement = SELECT_ROBOT_MAINTENANCE_LOGS if parts else SELECT_ROBOT_MAINTENANCE_LOGS_WITHOUT_PARTS
+    data = (await session.exec(statement , params={"robot_id" : robot_id})).one() # type: ignore
     return {"robot's maintenance logs" : data} # type: ignore
 
 @app.post("/robots/{robot_id}/maintenance_logs")
 async def add_maintenance_log(robot_id: int , body: create_maintenance_log , session: SessionDep) :
-    new_maintenance_log = maintenance_logs(robot_id=robot_id , **body.model_dump())
+    new_maintenance_log = maintenance_logs.model_validate(body , update={"robot_id" : robot_id})
     session.add(new_maintenance_log)
-    session.commit()
-    session.refresh(new_maintenance_log)
+    await session.commit()
     return {"logs" : new_maintenance_log}
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://127.0.0.1:8080" , "http://localhost:8080"],      
-    allow_credentials=True,
-    allow_methods=["*"],         
-    allow_headers=["*"],          
-)
+@app.post("/robots/{robot_id}/maintenance_logs:batch")
+async def add_maintenance_logs(robot_id: int , body: Annotated[list[create_maintenance_log] , Body(max_length=1000)] , session: SessionDep) :
+    if not body :
+        raise HTTPException(status_code=400 , detail="no maintenance logs provided")
+    # one executemany round-trip for the whole batch
+    try :
+        await session.exec(insert(maintenance_logs) , params=[{"robot_id" : robot_id , **log.model_dump()} for log in body])
+        await session.commit()
+    except IntegrityError as error :
+        await session.rollback()
+        if getattr(error.orig , "sqlstate" , None) == FOREIGN_KEY_VIOLATION :
+            raise HTTPException(status_code=404 , detail="robot or part doesn't exist")
+        raise
+    return {"message" : "maintenance logs successfully added" , "count" : len(body)}